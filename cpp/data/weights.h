@@ -0,0 +1,70 @@
+#ifndef DECODER_DATA_WEIGHTS_H_
+#define DECODER_DATA_WEIGHTS_H_
+#include <array>
+#include <cstdint>
+#include <fstream>
+#include <string>
+#include <vector>
+
+namespace weights
+{
+// Must match WEIGHTS_MAGIC/WEIGHTS_VERSION in python/decoder_training.py
+constexpr static std::array<char, 4> kMagic{'G', 'D', 'W', 'T'};
+constexpr static uint32_t kVersion = 1;
+constexpr static size_t kHeaderSize = kMagic.size() + 3 * sizeof(uint32_t);
+
+// Linear decoder exported by the Python trainer. Rows are the bias followed
+// by one row per neuron, columns are distance * cos(angle) and
+// distance * sin(angle).
+struct DecoderWeights {
+  uint32_t num_inputs;
+  uint32_t num_outputs;
+  std::vector<double> values;  // row-major, num_inputs x num_outputs
+
+  DecoderWeights() noexcept : num_inputs{0}, num_outputs{0}, values{} {}
+
+  double at(size_t row, size_t col) const noexcept
+  {
+    return values[row * num_outputs + col];
+  }
+
+  // Reads the little-endian blob written by RidgeDecoderTrainer.export().
+  static bool load(const std::string& path, DecoderWeights& result)
+  {
+    std::ifstream in(path, std::ios::binary | std::ios::ate);
+    if (!in) {
+      return false;
+    }
+    auto file_size = static_cast<size_t>(in.tellg());
+    in.seekg(0);
+
+    std::array<char, 4> magic{};
+    uint32_t version = 0;
+    in.read(magic.data(), magic.size());
+    in.read(reinterpret_cast<char*>(&version), sizeof(version));
+    in.read(reinterpret_cast<char*>(&result.num_inputs),
+            sizeof(result.num_inputs));
+    in.read(reinterpret_cast<char*>(&result.num_outputs),
+            sizeof(result.num_outputs));
+    if (!in || magic != kMagic || version != kVersion) {
+      return false;
+    }
+
+    // Reject truncated or padded blobs before trusting the header's shape.
+    auto num_values =
+        static_cast<size_t>(result.num_inputs) * result.num_outputs;
+    if (file_size != kHeaderSize + num_values * sizeof(double)) {
+      return false;
+    }
+
+    result.values.assign(num_values, 0.0);
+    in.read(reinterpret_cast<char*>(result.values.data()),
+            static_cast<std::streamsize>(result.values.size() *
+                                         sizeof(double)));
+    return static_cast<bool>(in);
+  }
+};
+
+};  // namespace weights
+
+#endif  // DECODER_DATA_WEIGHTS_H_
@@ -3,6 +3,7 @@
 #include <unistd.h>
 #include <safer_thread.h>
 #include <raster.h>
+#include <weights.h>
 #include <runtime_config.h>
 #include <receiver.h>
 #include <linux/tcp.h>
@@ -11,6 +12,7 @@
 #include <tclap/CmdLine.h>
 
 using SpikeRaster64 = raster::SpikeRaster64;
+using DecoderWeights = weights::DecoderWeights;
 using RasterQueue = moodycamel::BlockingConcurrentQueue<SpikeRaster64>;
 using CmdLine = TCLAP::CmdLine;
 using StringArg = TCLAP::ValueArg<std::string>;
@@ -36,8 +38,14 @@ void receive(RasterQueue &q)
   }
 }
 
-void decode(RasterQueue &q)
+void decode(RasterQueue &q, const DecoderWeights &w)
 {
+  if (w.values.empty()) {
+    LOG("No decoder weights loaded");
+  } else {
+    LOG("Decoder weights: " + std::to_string(w.num_inputs) + " x " +
+        std::to_string(w.num_outputs));
+  }
   SpikeRaster64 found;
   size_t count = 0;
   while (true) {
@@ -54,19 +62,24 @@ int main(int argc, char *argv[])
 {
   std::string ip;
   uint16_t port;
+  std::string weights_file;
   try {
     CmdLine cmd("CLI interface to launch the decoder", ' ', "0.0");
     StringArg arg_ip("i", "ip", "IP address to bind", false, "0.0.0.0",
                      "string");
     UShortArg arg_port("p", "port", "Port to listen on", false, 8808, "int");
+    StringArg arg_weights("w", "weights", "Trained decoder weights file",
+                          false, "", "string");
 
     cmd.add(arg_ip);
     cmd.add(arg_port);
+    cmd.add(arg_weights);
 
     cmd.parse(argc, argv);
 
     ip = arg_ip.getValue();
     port = arg_port.getValue();
+    weights_file = arg_weights.getValue();
 
     LOG("Binding to " + ip + ": " + std::to_string(port));
   } catch (ArgException &e) {
@@ -77,8 +90,16 @@ int main(int argc, char *argv[])
   runtimeconfig::set_listen_ip(ip);
   runtimeconfig::set_listen_port(port);
 
+  DecoderWeights decoder_weights;
+  if (!weights_file.empty() &&
+      !DecoderWeights::load(weights_file, decoder_weights)) {
+    LOG_ERROR("Unable to load decoder weights from " + weights_file);
+    exit(EXIT_FAILURE);
+  }
+
   auto raster_queue = RasterQueue();
-  auto decodes = SaferThread(std::thread(decode, std::ref(raster_queue)),
+  auto decodes = SaferThread(std::thread(decode, std::ref(raster_queue),
+                                         std::cref(decoder_weights)),
                              sthread::Action::kJoin);
   auto receives = SaferThread(std::thread(receive, std::ref(raster_queue)),
                               sthread::Action::kJoin);
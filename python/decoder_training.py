@@ -0,0 +1,151 @@
+import struct
+import numpy as np
+from typing import Generator, List, Optional, Tuple
+from neuron import NeuronSimulator
+from stimuli import ReachStimuli
+
+# Layout of the exported weights, mirrored by cpp/data/weights.h:
+#   magic (4 bytes) | version | num_inputs | num_outputs  (little endian uint32)
+#   num_inputs x num_outputs float64 weights, row-major, bias row first.
+WEIGHTS_MAGIC = b"GDWT"
+WEIGHTS_VERSION = 1
+WEIGHTS_HEADER = "<4sIII"
+
+# The decoder regresses onto the reach vector rather than (angle, distance):
+# angles are circular, and cosine-tuned counts scale with distance * cos(angle
+# - preferred), so only the vector is a linear function of the counts. The
+# angle and distance are recovered with atan2 and hypot.
+NUM_OUTPUTS = 2  # distance * cos(angle), distance * sin(angle)
+
+
+class DecoderTrainingError(Exception):
+    pass
+
+
+def reach_targets(reaches: ReachStimuli) -> np.ndarray:
+    """
+    Regression targets for a set of reaches, one row per reach.
+    """
+    return np.column_stack(
+        (
+            reaches.distances * np.cos(reaches.angles),
+            reaches.distances * np.sin(reaches.angles),
+        )
+    ).astype(float)
+
+
+def generate_population_counts(
+    neurons: List[NeuronSimulator],
+    reaches: ReachStimuli,
+    batch_size: int = 256,
+) -> Generator[Tuple[np.ndarray, ReachStimuli], None, None]:
+    """
+    Simulates one trial per reach for every neuron in the population and
+    yields (spike counts, reaches) in batches, where spike counts is a
+    (reach x neuron) array.
+    """
+    for start in range(0, len(reaches.angles), batch_size):
+        batch = ReachStimuli(
+            reaches.durations[start : start + batch_size],
+            reaches.angles[start : start + batch_size],
+            reaches.distances[start : start + batch_size],
+        )
+        counts = np.zeros((len(batch.angles), len(neurons)), dtype=float)
+        for n, neuron in enumerate(neurons):
+            rates = neuron.get_rates(batch)
+            for r, (rate, duration) in enumerate(zip(rates, batch.durations)):
+                raster = next(
+                    neuron.generate_rasters(
+                        spike_rate_hz=np.array([rate]),
+                        intervals_ms=np.array([duration]),
+                        num_trials=1,
+                        start_time=0,
+                    )
+                )
+                counts[r, n] = np.count_nonzero(raster < duration)
+        yield counts, batch
+
+
+class RidgeDecoderTrainer:
+    """
+    Ridge-regression population decoder trained from sufficient statistics.
+
+    Only X^T X and X^T y are kept (X being spike counts with a leading bias
+    column), so memory is fixed by the population size no matter how many
+    trials are streamed through update(). Trainers fed on separate workers
+    can be merged.
+    """
+
+    def __init__(self, num_neurons: int, ridge: float = 1.0):
+        if ridge < 0:
+            raise DecoderTrainingError("Ridge penalty must be non-negative.")
+        self.num_neurons = num_neurons
+        self.ridge = ridge
+        self.num_samples = 0
+        self.xtx = np.zeros((num_neurons + 1, num_neurons + 1), dtype=float)
+        self.xty = np.zeros((num_neurons + 1, NUM_OUTPUTS), dtype=float)
+        self.weights: Optional[np.ndarray] = None
+
+    def _design(self, counts: np.ndarray) -> np.ndarray:
+        counts = np.asarray(counts, dtype=float)
+        if counts.ndim != 2 or counts.shape[1] != self.num_neurons:
+            raise DecoderTrainingError(
+                f"Expected (trials x {self.num_neurons}) counts, got {counts.shape}"
+            )
+        return np.hstack((np.ones((counts.shape[0], 1)), counts))
+
+    def update(self, counts: np.ndarray, reaches: ReachStimuli) -> None:
+        x = self._design(counts)
+        y = reach_targets(reaches)
+        if x.shape[0] != y.shape[0]:
+            raise DecoderTrainingError("Counts and reaches must be 1:1.")
+        self.xtx += x.T @ x
+        self.xty += x.T @ y
+        self.num_samples += x.shape[0]
+
+    def merge(self, other: "RidgeDecoderTrainer") -> "RidgeDecoderTrainer":
+        if self.num_neurons != other.num_neurons:
+            raise DecoderTrainingError("Cannot merge trainers of different sizes.")
+        self.xtx += other.xtx
+        self.xty += other.xty
+        self.num_samples += other.num_samples
+        return self
+
+    def solve(self) -> np.ndarray:
+        """
+        Solves (X^T X + ridge * I) W = X^T y. The bias term is not penalized.
+        """
+        if self.num_samples == 0:
+            raise DecoderTrainingError("No training data has been accumulated.")
+        penalty = self.ridge * np.eye(self.num_neurons + 1)
+        penalty[0, 0] = 0
+        self.weights = np.linalg.solve(self.xtx + penalty, self.xty)
+        return self.weights
+
+    def predict(self, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the decoded reach angles (radians) and distances.
+        """
+        if self.weights is None:
+            self.solve()
+        y = self._design(counts) @ self.weights
+        return np.arctan2(y[:, 1], y[:, 0]), np.hypot(y[:, 0], y[:, 1])
+
+    def export(self, path: str) -> None:
+        """
+        Writes the weights in the binary layout read by the C++ decoder.
+        """
+        if self.weights is None:
+            self.solve()
+        num_inputs, num_outputs = self.weights.shape
+        with open(path, "wb") as f:
+            f.write(
+                struct.pack(
+                    WEIGHTS_HEADER,
+                    WEIGHTS_MAGIC,
+                    WEIGHTS_VERSION,
+                    num_inputs,
+                    num_outputs,
+                )
+            )
+            f.write(np.ascontiguousarray(self.weights, dtype="<f8").tobytes())
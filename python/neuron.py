@@ -24,16 +24,17 @@ class NeuronSimulator:
         rate_func: Optional[Callable[[Stimuli], np.ndarray]] = None,
         preferred_stimulus: Optional[Stimuli] = None,
         group_name: str = "unk",
+        seed: Optional[int] = None,
     ):
+        self.rng = np.random.default_rng(seed)
         if distribution == SpikeDistribution.EXP:
-            rand_func = lambda beta: np.random.exponential(beta)
+            rand_func = lambda beta: self.rng.exponential(beta)
         elif distribution == SpikeDistribution.GAMMA:
             if scaling_factor is None:
                 raise NeuronError("Gamma distribution type requires a scaling factor.")
             shape = scaling_factor + 1
-            rand_func = lambda beta: np.random.gamma(shape, beta)
+            rand_func = lambda beta: self.rng.gamma(shape, beta)
         elif distribution == SpikeDistribution.POISSON:
-            self.rng = np.random.default_rng()
             rand_func = lambda beta: self.rng.poisson(beta)
         else:
             raise NeuronError(f"Distribution {distribution} not implemented!")
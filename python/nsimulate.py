@@ -24,22 +24,24 @@
 # **
 # ***************************************************************************/
 
-import asyncio
-import struct
-import binascii
-import sys
-import argparse
-import numpy as np
 import time
+
+_process_start = time.perf_counter()
+
+import numpy as np
 from nsimulate_util import (
     build_args,
     parse_mat_file,
-    generate_inter_spike_interval_hist,
     generate_spike_time_hist,
+    plot_inter_spike_interval_hist,
     plot_rasters,
+    plot_smoothed_rate,
+    plot_spike_time_hist,
     show,
 )
 from neuron import NeuronSimulator, SpikeDistribution
+from rate_estimation import RateKernel, smooth_rates
+from spike_stats import RasterStatistics, SpikeTimeHistogram, batched
 from stimuli import ReachStimuli
 
 
@@ -89,6 +91,8 @@ def sim3_1():
         )
         # generate_inter_spike_interval_hist(
         #     spike_trains=rasters,
+        #     duration_ms=stimulus_durations,
+        #     bin_size_ms=10,
         #     figure_number=(fig_num+1)*9,
         #     show_plots=True
         # )
@@ -122,7 +126,64 @@ def sim3_1():
     #     plt.draw()
 
 
+def train_decoder(
+    num_neurons: int,
+    num_trials: int,
+    min_distance_cm: float,
+    max_distance_cm: float,
+    ridge: float,
+    batch_size: int,
+    weights_file: str,
+):
+    from decoder_training import RidgeDecoderTrainer, generate_population_counts
+
+    # A population of cosine-tuned neurons whose preferred directions evenly
+    # cover the circle, trained on uniformly random reach directions and
+    # distances.
+    ms_val = 500
+    neurons = [
+        NeuronSimulator(
+            SpikeDistribution.GAMMA,
+            scaling_factor=2,
+            rate_func=sim3_1_rate_func,
+            preferred_stimulus=ReachStimuli(
+                np.array([ms_val]), np.array([angle]), np.array([max_distance_cm])
+            ),
+        )
+        for angle in np.linspace(0, 2 * np.pi, num_neurons, endpoint=False)
+    ]
+    reaches = ReachStimuli(
+        np.ones(num_trials) * ms_val,
+        np.random.uniform(0, 2 * np.pi, num_trials),
+        np.random.uniform(min_distance_cm, max_distance_cm, num_trials),
+    )
+
+    trainer = RidgeDecoderTrainer(num_neurons, ridge=ridge)
+    held_out = None
+    for counts, batch in generate_population_counts(neurons, reaches, batch_size):
+        # The first batch is held out to report the decoding error.
+        if held_out is None and len(batch.angles) < num_trials:
+            held_out = (counts, batch)
+            continue
+        trainer.update(counts, batch)
+
+    trainer.solve()
+    trainer.export(weights_file)
+    print(f"Trained on {trainer.num_samples} trials, weights in {weights_file}")
+    if held_out is not None:
+        counts, batch = held_out
+        angles, distances = trainer.predict(counts)
+        error = np.angle(np.exp(1j * (angles - batch.angles)))
+        print(
+            f"Held-out mean abs. angle error: {np.rad2deg(np.abs(error)).mean():.3f} "
+            f"deg, distance error: {np.abs(distances - batch.distances).mean():.3f} cm"
+        )
+
+
 async def simulate_reaches(num_trials: int, ip: str, port: int):
+    import asyncio
+    import struct
+
     radians = np.deg2rad(np.linspace(0, 315, 8))
     milliseconds = np.ones(radians.shape) * 500
     centimeters = np.ones(radians.shape) * 10
@@ -165,7 +226,7 @@ async def simulate_reaches(num_trials: int, ip: str, port: int):
 
 def main(args):
     mode = args.mode
-    show_plots = args.show
+    show_plots = getattr(args, "show", False)
 
     if mode == "file":
         parse_mat_file(args.mat_file)
@@ -181,37 +242,107 @@ def main(args):
         neuron.tune_cosine_model(dirs=dirs, rates=rates)
 
     elif mode == "synthetic":
-        neuron = NeuronSimulator(SpikeDistribution[args.rand])
+        neuron = NeuronSimulator(
+            SpikeDistribution[args.rand], scaling_factor=args.scale_factor
+        )
         assert len(args.intervals) == len(args.rates)
-        spike_trains = list(
-            neuron.generate_rasters(
-                spike_rate_hz=np.asarray(args.rates),
-                intervals_ms=np.asarray(args.intervals),
-                num_trials=args.num_trials,
-                start_time=args.start_time or 0,
-            )
+        spike_trains = neuron.generate_rasters(
+            spike_rate_hz=np.asarray(args.rates),
+            intervals_ms=np.asarray(args.intervals),
+            num_trials=args.num_trials,
+            start_time=args.start_time or 0,
         )
+        # Rasters are only retained when they have to be plotted; otherwise
+        # they are folded into the running statistics and dropped.
         if args.show:
+            spike_trains = list(spike_trains)
             plot_rasters(spike_trains, figure_number=0)
 
-        generate_spike_time_hist(
-            spike_trains=spike_trains,
+        stats = RasterStatistics(
+            start_time_ms=args.start_time or 0,
             duration_ms=sum(args.intervals),
             bin_size_ms=args.bin_size,
-            show_plots=show_plots,
-            figure_number=1,
         )
-        generate_inter_spike_interval_hist(
-            spike_trains=spike_trains,
-            duration_ms=sum(args.intervals),
-            show_plots=show_plots,
-            figure_number=2,
+        # Rates are binned at 1 ms before smoothing, independent of the
+        # --bin-size used for the PSTH.
+        fine_psth = None
+        if args.kernel is not None:
+            fine_psth = SpikeTimeHistogram(
+                start_time_ms=args.start_time or 0,
+                duration_ms=sum(args.intervals),
+                bin_size_ms=1,
+            )
+        for batch in batched(spike_trains, args.batch_size):
+            stats.update(batch)
+            if fine_psth is not None:
+                fine_psth.update(batch)
+
+        print(
+            f"trials: {stats.num_trials}, "
+            f"spikes/trial: {stats.spike_counts.mean:.3f} "
+            f"(var {stats.spike_counts.variance:.3f}), "
+            f"ISI: {stats.isi.moments.mean:.3f} ms "
+            f"(var {stats.isi.moments.variance:.3f})"
         )
 
+        if show_plots:
+            plot_spike_time_hist(stats, figure_number=1)
+            plot_inter_spike_interval_hist(stats, figure_number=2)
+
+        if fine_psth is not None and fine_psth.num_trials > 0:
+            # Smoothing is linear, so the trial-averaged rate is the smoothed
+            # 1 ms PSTH and never needs the individual trials.
+            smoothed = smooth_rates(
+                fine_psth.counts / fine_psth.num_trials,
+                RateKernel[args.kernel],
+                args.kernel_width,
+            )
+            peak = int(np.argmax(smoothed))
+            print(
+                f"{args.kernel} smoothed rate: mean {smoothed.mean():.3f} hz, "
+                f"peak {smoothed[peak]:.3f} hz "
+                f"at {(args.start_time or 0) + peak} ms"
+            )
+            if show_plots:
+                plot_smoothed_rate(smoothed, args.start_time or 0, 1, figure_number=3)
+
     elif mode == "sim3_1":
         sim3_1()
 
+    elif mode == "train":
+        assert 0 <= args.min_dist <= args.max_dist
+        train_decoder(
+            num_neurons=args.num_neurons,
+            num_trials=args.num_trials,
+            min_distance_cm=args.min_dist,
+            max_distance_cm=args.max_dist,
+            ridge=args.ridge,
+            batch_size=args.batch_size,
+            weights_file=args.weights_file,
+        )
+
+    elif mode == "sweep":
+        import json
+        from sweep import SweepCache, build_grid, run_sweep
+
+        with open(args.sweep_file) as f:
+            points = build_grid(json.load(f), seed=args.seed)
+        cache = SweepCache(args.cache_dir)
+        num_cached = sum(point in cache for point in points)
+        print(f"{len(points)} sweep points, {num_cached} cached")
+        for point, result in run_sweep(points, cache, max_workers=args.workers):
+            _, mean, _ = result["spike_count_moments"]
+            _, isi_mean, _ = result["isi_moments"]
+            print(
+                f"{point.rand} sf={point.scale_factor} rates={point.rates} "
+                f"intervals={point.intervals} n={point.num_trials}: "
+                f"spikes/trial {mean:.3f}, ISI {isi_mean:.3f} ms, "
+                f"peak PSTH {result['psth'].max(initial=0):.3f} hz"
+            )
+
     elif mode == "simulate":
+        import asyncio
+
         asyncio.run(
             simulate_reaches(
                 num_trials=args.num_trials, ip=args.dest_ip, port=args.dest_port
@@ -230,4 +361,8 @@ if __name__ == "__main__":
     Run with --help/-h for a usage example.
     """
     args = build_args()
+    if args.lat:
+        print(f"startup: {(time.perf_counter() - _process_start) * 1000:.1f} ms")
     main(args)
+    if args.lat:
+        print(f"total: {(time.perf_counter() - _process_start) * 1000:.1f} ms")
@@ -1,10 +1,10 @@
 import argparse
 from enum import Enum
 import numpy as np
-import scipy.io as io
-import matplotlib.pyplot as plt
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from neuron import SpikeDistribution
+from rate_estimation import RateKernel
+from spike_stats import RasterStatistics
 
 
 class NSimTune(Enum):
@@ -13,24 +13,11 @@ class NSimTune(Enum):
     synthetic = "synthetic"
     sim3_1 = "sim3_1"
     simulate = "simulate"
+    train = "train"
+    sweep = "sweep"
 
 
-def build_args():
-    parser = argparse.ArgumentParser(
-        "A Neural Spike Train generator.",
-        usage="python3 nsimulate --mode synthetic --rates 50 --intervals 2000 --bin-size 10 --num-trials 10 --rand EXP --show",
-    )
-
-    # main parameters
-    parser.add_argument(
-        "--mode",
-        "-m",
-        type=str,
-        default="synthetic",
-        choices=[e.value for e in NSimTune],
-        help="synthetic spikes generated by prob. distribution or file input",
-    )
-
+def _add_show_arg(parser: argparse.ArgumentParser):
     parser.add_argument(
         "--show",
         "-s",
@@ -39,22 +26,34 @@ def build_args():
         help="whether or not to show the plots",
     )
 
+
+def _add_num_trials_arg(parser: argparse.ArgumentParser, default: int = 10):
     parser.add_argument(
-        "--dest-ip",
-        "-ip",
-        type=str,
-        default="127.0.0.1",
-        help="destination hostname for generated rasters",
+        "--num-trials",
+        "-n",
+        type=int,
+        default=default,
+        help="the number of trials we'll generate for each target",
     )
 
+
+def _add_batch_size_arg(parser: argparse.ArgumentParser, default: int):
     parser.add_argument(
-        "--dest-port",
-        "-p",
+        "--batch-size",
+        "-bs",
         type=int,
-        default=8808,
-        help="destination port for generated rasters",
+        default=default,
+        help="number of generated rasters accumulated at a time",
+    )
+
+
+def build_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        "A Neural Spike Train generator.",
+        usage="python3 nsimulate.py synthetic --rates 50 --intervals 2000 --bin-size 10 --num-trials 10 --rand EXP --show",
     )
 
+    # main parameters
     parser.add_argument(
         "--lat",
         "-l",
@@ -63,29 +62,51 @@ def build_args():
         help="whether or not to measure script latencies",
     )
 
+    # Every subcommand only pulls in the backends (matplotlib, scipy, asyncio)
+    # it actually uses when it runs.
+    modes = parser.add_subparsers(dest="mode", metavar="mode", required=True)
+
     # file input parameters
-    parser.add_argument(
+    file_mode = modes.add_parser(
+        NSimTune.file.value, help="parse a .mat file of recorded spikes"
+    )
+    file_mode.add_argument(
         "--mat-file",
         "-mf",
         type=str,
+        required=True,
         help="filename argument for a .matfile (hardcoded to 100x8 array of"
         "structs containing 2-D arrays)",
     )
 
-    # tuning curve parameters
-    parser.add_argument(
-        "--dirs",
-        "-d",
+    # raster generation parameters
+    synthetic = modes.add_parser(
+        NSimTune.synthetic.value,
+        help="spikes generated by a probability distribution",
+    )
+    synthetic.add_argument(
+        "--rates", "-r", nargs="+", type=int, required=True, help="rate in spikes/s"
+    )
+    synthetic.add_argument(
+        "--intervals",
+        "-dt",
         nargs="+",
-        default=[10, 20, 30],
         type=int,
-        help="list of the potential reach directions in units of degrees",
+        required=True,
+        help="the intervals of the stimuli in units of milliseconds",
     )
-
-    parser.add_argument("--rates", "-r", nargs="+", type=int, help="rate in spikes/s")
-
-    # probability distribution parameters
-    parser.add_argument(
+    synthetic.add_argument(
+        "--rand",
+        "-rn",
+        type=str,
+        required=True,
+        choices=[x.name for x in SpikeDistribution],
+        help="type of random variable",
+    )
+    synthetic.add_argument(
+        "--scale-factor", "-sf", type=int, help="GAMMA distribution scale factor"
+    )
+    synthetic.add_argument(
         "--type",
         "-t",
         type=str,
@@ -93,81 +114,165 @@ def build_args():
         choices=["Poisson"],
         help="type of synthetic data",
     )
-
-    parser.add_argument(
+    synthetic.add_argument(
         "--shift",
         "-sh",
         type=int,
         default=20,
         help="dc shift or offset of the probability distribution",
     )
-
-    parser.add_argument(
-        "--dists", "-td", type=int, default=10, help="target distance in units of cm"
-    )
-
-    parser.add_argument(
-        "--rand",
-        "-rn",
-        type=str,
-        choices=[x.name for x in SpikeDistribution],
-        help="type of random variable",
-    )
-
-    parser.add_argument(
-        "--scale-factor", "-sf", type=int, help="GAMMA distribution scale factor"
-    )
-
-    parser.add_argument(
+    synthetic.add_argument(
         "--pref-dir",
         "-pd",
         type=int,
         default=45,
         help="preferred target direction in units of degrees",
     )
-
-    parser.add_argument(
-        "--num-trials",
-        "-n",
+    _add_num_trials_arg(synthetic)
+    synthetic.add_argument(
+        "--start-time",
+        "-st",
+        type=int,
+        help="the time (ms) at which each generated raster starts",
+    )
+    synthetic.add_argument(
+        "--bin-size",
+        "-b",
         type=int,
         default=10,
-        help="the number of trials we'll generate for each target",
+        help="the binning resolution at which to capture the millisecond data",
+    )
+    _add_batch_size_arg(synthetic, default=1024)
+    synthetic.add_argument(
+        "--kernel",
+        "-k",
+        type=str,
+        choices=[x.name for x in RateKernel],
+        help="kernel used to smooth the trial-averaged firing rate",
     )
+    synthetic.add_argument(
+        "--kernel-width",
+        "-kw",
+        type=float,
+        default=20,
+        help="kernel width (std. dev., time constant or window) in ms",
+    )
+    _add_show_arg(synthetic)
 
-    parser.add_argument(
-        "--start-time",
-        "-st",
-        type=int,
-        help="the number of trials we'll generate for each target",
+    sim3_1 = modes.add_parser(
+        NSimTune.sim3_1.value, help="gamma neuron tuned to a 0 degree reach"
     )
+    _add_show_arg(sim3_1)
 
-    # raster generation parameters
-    parser.add_argument(
-        "--intervals",
-        "-dt",
-        nargs="+",
+    simulate = modes.add_parser(
+        NSimTune.simulate.value, help="stream reach rasters to a decoder"
+    )
+    _add_num_trials_arg(simulate)
+    simulate.add_argument(
+        "--dest-ip",
+        "-ip",
+        type=str,
+        default="127.0.0.1",
+        help="destination hostname for generated rasters",
+    )
+    simulate.add_argument(
+        "--dest-port",
+        "-p",
         type=int,
-        help="the intervals of the stimuli in units of milliseconds",
+        default=8808,
+        help="destination port for generated rasters",
     )
 
-    parser.add_argument(
-        "--bin-size",
-        "-b",
+    # decoder training parameters
+    train = modes.add_parser(
+        NSimTune.train.value, help="train a linear decoder on a simulated population"
+    )
+    _add_num_trials_arg(train)
+    train.add_argument(
+        "--num-neurons",
+        "-nn",
         type=int,
+        default=16,
+        help="number of neurons in the simulated population",
+    )
+    train.add_argument(
+        "--min-dist",
+        type=float,
+        default=2,
+        help="shortest sampled target distance in units of cm",
+    )
+    train.add_argument(
+        "--max-dist",
+        type=float,
         default=10,
-        help="the binning resolution at which to capture the millisecond data",
+        help="longest sampled target distance in units of cm",
+    )
+    train.add_argument(
+        "--ridge",
+        type=float,
+        default=1.0,
+        help="ridge penalty of the trained decoder",
+    )
+    _add_batch_size_arg(train, default=256)
+    train.add_argument(
+        "--weights-file",
+        "-wf",
+        type=str,
+        default="decoder_weights.bin",
+        help="output file for the trained decoder weights",
     )
 
-    return parser.parse_args()
+    # parameter sweep parameters
+    sweep = modes.add_parser(
+        NSimTune.sweep.value, help="run a cached grid of simulator configurations"
+    )
+    sweep.add_argument(
+        "--sweep-file",
+        "-swf",
+        type=str,
+        required=True,
+        help="JSON grid of simulator/stimulus configurations to sweep",
+    )
+    sweep.add_argument(
+        "--cache-dir",
+        "-cd",
+        type=str,
+        default=".sweep_cache",
+        help="directory caching the results of previously swept points",
+    )
+    sweep.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        help="number of sweep worker processes (defaults to the cpu count)",
+    )
+    sweep.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="random seed of every sweep point",
+    )
+
+    return parser.parse_args(argv)
+
+
+def _pyplot():
+    """
+    matplotlib is only imported the first time something is plotted.
+    """
+    import matplotlib.pyplot as plt
+
+    return plt
 
 
 def show():
-    plt.show()
+    _pyplot().show()
 
 
 def plot_cosine_model(k: np.ndarray, figure_number: int) -> None:
     theta = np.linspace(0, 2 * np.pi, 80)
     exp_firing_rates = k[0][0] + k[1][0] * np.sin(theta) + k[2][0] * np.cos(theta)
+    plt = _pyplot()
     plt.figure(figure_number)
     plt.plot(dirs, rates, "r*")
     plt.plot(np.rad2deg(theta), exp_firing_rates)
@@ -177,6 +282,7 @@ def plot_cosine_model(k: np.ndarray, figure_number: int) -> None:
 
 
 def plot_rasters(spike_trains: List[np.ndarray], figure_number: Optional[int]) -> None:
+    plt = _pyplot()
     plt.figure(figure_number)
     plt.eventplot(spike_trains)
     plt.xlabel("time (ms)")
@@ -184,49 +290,29 @@ def plot_rasters(spike_trains: List[np.ndarray], figure_number: Optional[int]) -
     plt.draw()
 
 
-def _mask_pad(array: np.ndarray, max_length: int) -> np.ndarray:
-    """
-    Utility to create a masked array that fills to max_length
-    """
-    ogLen = len(array)
-    assert ogLen <= max_length
-    masked_array = np.asarray(np.zeros(max_length))
-    for i in range(0, max_length):
-        masked_array[i] = array[i] if i < ogLen else np.ma.masked
-    return masked_array
-
-
 def generate_inter_spike_interval_hist(
-    spike_trains: np.ndarray,
+    spike_trains: Iterable[np.ndarray],
+    duration_ms: np.ndarray,
+    bin_size_ms: int,
     figure_number: Optional[int],
     show_plots: bool = False,
-) -> List[np.ndarray]:
-    """
-    Creates a histogram of the inter-spike intervals in the provided rasters
+) -> np.ndarray:
     """
-    isi = []
-    # max diff intervals length of the provided spike_trains
-    max_length = len(max(spike_trains, key=len)) - 1
-    for trial in spike_trains:
-        intervals = np.diff(trial)
-        current_length = len(intervals)
-        masked_intervals = intervals
-        if current_length < max_length:
-            masked_intervals = _mask_pad(intervals, max_length)
-        isi.append(masked_intervals)
+    Creates a histogram of the inter-spike intervals in the provided rasters.
+    Intervals longer than duration_ms are counted in a final overflow bin.
 
+    spike_trains may be any iterable of rasters (including the generator
+    from NeuronSimulator.generate_rasters); it is consumed in batches.
+    """
+    stats = RasterStatistics(0, duration_ms, bin_size_ms).consume(spike_trains)
     if show_plots:
-        plt.figure(figure_number)
-        plt.hist(isi)
-        plt.xlabel("inter-spike interval (ms)")
-        plt.ylabel("# spikes")
-        plt.draw()
+        plot_inter_spike_interval_hist(stats, figure_number)
 
-    return isi
+    return stats.isi.counts
 
 
 def generate_spike_time_hist(
-    spike_trains: np.ndarray,
+    spike_trains: Iterable[np.ndarray],
     start_time_ms: int,
     duration_ms: np.ndarray,
     bin_size_ms: int,
@@ -236,42 +322,54 @@ def generate_spike_time_hist(
     """
     Creates a histogram of the binned spike counts
     from neurons modeled by the Poisson process for a given bin size.
-    """
-    num_trials = len(spike_trains)
-    start = start_time_ms
-    sentinel = start + bin_size_ms
-    idx = 0
-    total_time = np.sum(duration_ms)
-    end_time = total_time
-    if start < 0:
-        end_time += start
-    num_bins = int(total_time / bin_size_ms)
-    spike_counts = np.zeros(num_bins, dtype=float)
-    # divide by number of trials and delta-t to get avg rate in hz
-    trials_and_delta_t = bin_size_ms * 10 ** (-3) * num_trials
-    while sentinel < end_time:
-        # accumulate count of values between start and stop for this bin across all trials
-        for trial in range(0, num_trials):
-            curr_trial = spike_trains[trial]
-            lb = curr_trial[curr_trial >= start]
-            ub = curr_trial[curr_trial < sentinel]
-            inter = np.intersect1d(lb, ub, assume_unique=True)
-            spike_counts[idx] += inter.shape[0]
-        # now we'll take the average for this bin across all trials
-        # and slide our window forward
-        spike_counts[idx] = spike_counts[idx] / trials_and_delta_t
-        start += bin_size_ms
-        sentinel += bin_size_ms
-        idx += 1
 
+    spike_trains may be any iterable of rasters (including the generator
+    from NeuronSimulator.generate_rasters); it is consumed in batches. Each
+    spike is counted once, in the bin [start, start + bin_size_ms) holding it.
+    """
+    stats = RasterStatistics(start_time_ms, duration_ms, bin_size_ms).consume(
+        spike_trains
+    )
     if show_plots:
-        plt.figure(figure_number)
-        plt.bar(range(0, num_bins), spike_counts, align="center")
-        plt.xlabel(f"bins ({bin_size_ms}s of ms)")
-        plt.ylabel("avg spike rate (hz)")
-        plt.draw()
+        plot_spike_time_hist(stats, figure_number)
+
+    return stats.psth.rates
+
+
+def plot_spike_time_hist(stats: RasterStatistics, figure_number: Optional[int]):
+    psth = stats.psth
+    plt = _pyplot()
+    plt.figure(figure_number)
+    plt.bar(range(0, psth.num_bins), psth.rates, align="center")
+    plt.xlabel(f"bins ({psth.bin_size_ms}s of ms)")
+    plt.ylabel("avg spike rate (hz)")
+    plt.draw()
+
+
+def plot_smoothed_rate(
+    rates: np.ndarray,
+    start_time_ms: int,
+    bin_size_ms: int,
+    figure_number: Optional[int],
+):
+    plt = _pyplot()
+    plt.figure(figure_number)
+    plt.plot(start_time_ms + np.arange(len(rates)) * bin_size_ms, rates)
+    plt.xlabel("time (ms)")
+    plt.ylabel("smoothed spike rate (hz)")
+    plt.draw()
 
-    return spike_counts
+
+def plot_inter_spike_interval_hist(
+    stats: RasterStatistics, figure_number: Optional[int]
+):
+    isi = stats.isi
+    plt = _pyplot()
+    plt.figure(figure_number)
+    plt.bar(isi.bin_edges, isi.counts, width=isi.bin_size_ms, align="edge")
+    plt.xlabel("inter-spike interval (ms)")
+    plt.ylabel("# spikes")
+    plt.draw()
 
 
 def parse_mat_file(mat_file: str):
@@ -283,6 +381,8 @@ def parse_mat_file(mat_file: str):
     the rows are each each neuron sensor
     the columns are millisecond, where 1 implies an action potential firing has been detected by that sensor
     """
+    import scipy.io as io
+
     var_name = io.whosmat(mat_file)[0][0]
     mat_contents = io.loadmat(mat_file)
     plan_training_data = mat_contents[var_name]
@@ -0,0 +1,117 @@
+from enum import Enum
+import numpy as np
+from typing import List, Tuple
+
+
+class RateKernel(Enum):
+    GAUSSIAN = 0
+    EXPONENTIAL = 1  # causal
+    BOXCAR = 2
+
+
+class RateEstimationError(Exception):
+    pass
+
+
+def bin_spike_trains(
+    spike_trains: List[np.ndarray],
+    start_time_ms: int,
+    duration_ms: int,
+    bin_size_ms: int = 1,
+) -> np.ndarray:
+    """
+    Bins a batch of rasters into a (trial x time) array of spike counts.
+    All trials are binned with a single bincount rather than one at a time.
+    """
+    num_bins = int(np.sum(duration_ms) / bin_size_ms)
+    num_trials = len(spike_trains)
+    if num_trials == 0:
+        return np.zeros((0, num_bins), dtype=float)
+
+    lengths = [len(t) for t in spike_trains]
+    trial_idx = np.repeat(np.arange(num_trials), lengths)
+    times = np.concatenate([np.asarray(t, dtype=float) for t in spike_trains])
+    bins = np.floor((times - start_time_ms) / bin_size_ms)
+    in_range = (bins >= 0) & (bins < num_bins)
+    flat = trial_idx[in_range] * num_bins + bins[in_range].astype(np.int64)
+    counts = np.bincount(flat, minlength=num_trials * num_bins)
+    return counts.reshape(num_trials, num_bins).astype(float)
+
+
+def build_kernel(
+    kernel: RateKernel, width_ms: float, bin_size_ms: int = 1
+) -> Tuple[np.ndarray, int]:
+    """
+    Returns a unit-area kernel sampled at bin_size_ms, and the index of the
+    sample aligned with the current time bin.
+
+    width_ms is the standard deviation for GAUSSIAN, the decay time constant
+    for EXPONENTIAL and the full window length for BOXCAR.
+    """
+    if width_ms <= 0:
+        raise RateEstimationError("Kernel width must be positive.")
+    width = width_ms / bin_size_ms
+
+    if kernel == RateKernel.GAUSSIAN:
+        half = int(np.ceil(4 * width))
+        t = np.arange(-half, half + 1)
+        k = np.exp(-0.5 * (t / width) ** 2)
+        origin = half
+    elif kernel == RateKernel.EXPONENTIAL:
+        t = np.arange(0, int(np.ceil(5 * width)) + 1)
+        k = np.exp(-t / width)
+        origin = 0
+    elif kernel == RateKernel.BOXCAR:
+        k = np.ones(max(int(round(width)), 1))
+        origin = (len(k) - 1) // 2
+    else:
+        raise RateEstimationError(f"Kernel {kernel} not implemented!")
+
+    return k / np.sum(k), origin
+
+
+def smooth_rates(
+    binned_counts: np.ndarray,
+    kernel: RateKernel,
+    width_ms: float,
+    bin_size_ms: int = 1,
+) -> np.ndarray:
+    """
+    Convolves binned spike counts with the requested kernel along the last
+    (time) axis and returns instantaneous rates in hz. Leading axes (trials,
+    neurons, ...) are filtered together with a single real FFT, whose
+    round-off is clipped so rates are never negative. Bins near the edges of
+    the window are normalized by the part of the kernel inside the window.
+    """
+    counts = np.asarray(binned_counts, dtype=float)
+    k, origin = build_kernel(kernel, width_ms, bin_size_ms)
+    num_bins = counts.shape[-1]
+    n = 1 << int(np.ceil(np.log2(num_bins + len(k) - 1)))
+    k_spectrum = np.fft.rfft(k, n=n)
+    window = slice(origin, origin + num_bins)
+    spectrum = np.fft.rfft(counts, n=n, axis=-1) * k_spectrum
+    smoothed = np.fft.irfft(spectrum, n=n, axis=-1)[..., window]
+    # Near the edges part of the kernel falls outside the window, so divide
+    # by the kernel weight that is actually inside it.
+    coverage = np.fft.irfft(np.fft.rfft(np.ones(num_bins), n=n) * k_spectrum, n=n)
+    smoothed = smoothed / coverage[window]
+    return np.maximum(smoothed, 0) / (bin_size_ms * 10 ** (-3))
+
+
+def estimate_rates(
+    spike_trains: List[np.ndarray],
+    start_time_ms: int,
+    duration_ms: int,
+    kernel: RateKernel = RateKernel.GAUSSIAN,
+    width_ms: float = 20,
+    bin_size_ms: int = 1,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Smoothed firing rate estimate (hz) for every trial of a batch of rasters,
+    along with the trial-averaged rate.
+    """
+    counts = bin_spike_trains(spike_trains, start_time_ms, duration_ms, bin_size_ms)
+    if counts.shape[0] == 0:
+        return counts, np.zeros(counts.shape[1], dtype=float)
+    rates = smooth_rates(counts, kernel, width_ms, bin_size_ms)
+    return rates, rates.mean(axis=0)
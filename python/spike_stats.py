@@ -0,0 +1,213 @@
+from itertools import islice
+import numpy as np
+from typing import Iterable, Iterator, List, Optional
+
+
+class SpikeStatsError(Exception):
+    pass
+
+
+def batched(
+    spike_trains: Iterable[np.ndarray], batch_size: int
+) -> Iterator[List[np.ndarray]]:
+    """
+    Groups a (possibly unbounded) stream of rasters, e.g. the generator returned
+    by NeuronSimulator.generate_rasters, into lists of at most batch_size trials.
+    """
+    if batch_size < 1:
+        raise SpikeStatsError("Batch size must be at least 1.")
+    it = iter(spike_trains)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class RunningMoments:
+    """
+    Welford/Chan running mean and variance. Batches are reduced with numpy and
+    then combined with the running totals, so two accumulators built on
+    different workers can be merged without revisiting any samples.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the mean
+
+    def _combine(self, count: int, mean: float, m2: float) -> None:
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        mean = values.mean()
+        self._combine(values.size, mean, float(np.sum((values - mean) ** 2)))
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        self._combine(other.count, other.mean, other.m2)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """
+        Sample (n - 1) variance, nan until at least two samples are seen.
+        """
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self) -> float:
+        return np.sqrt(self.variance)
+
+
+class SpikeTimeHistogram:
+    """
+    Running peri-stimulus time histogram. Only the per-bin spike sums and the
+    number of trials seen are kept, so memory does not depend on trial count.
+    """
+
+    def __init__(self, start_time_ms: int, duration_ms: int, bin_size_ms: int):
+        if bin_size_ms <= 0:
+            raise SpikeStatsError("Bin size must be positive.")
+        self.start_time_ms = start_time_ms
+        self.bin_size_ms = bin_size_ms
+        self.num_bins = int(np.sum(duration_ms) / bin_size_ms)
+        self.counts = np.zeros(self.num_bins, dtype=np.int64)
+        self.num_trials = 0
+
+    def update(self, spike_trains: List[np.ndarray]) -> None:
+        """
+        Bins every spike of a batch of trials in one pass.
+        """
+        self.num_trials += len(spike_trains)
+        if not spike_trains:
+            return
+        times = np.concatenate([np.asarray(t, dtype=float) for t in spike_trains])
+        idx = np.floor((times - self.start_time_ms) / self.bin_size_ms)
+        idx = idx[(idx >= 0) & (idx < self.num_bins)].astype(np.int64)
+        self.counts += np.bincount(idx, minlength=self.num_bins)
+
+    def merge(self, other: "SpikeTimeHistogram") -> "SpikeTimeHistogram":
+        if (
+            self.start_time_ms != other.start_time_ms
+            or self.bin_size_ms != other.bin_size_ms
+            or self.num_bins != other.num_bins
+        ):
+            raise SpikeStatsError("Cannot merge histograms with different bins.")
+        self.counts += other.counts
+        self.num_trials += other.num_trials
+        return self
+
+    @property
+    def rates(self) -> np.ndarray:
+        """
+        Average spike rate (hz) per bin across all trials seen so far.
+        """
+        if self.num_trials == 0:
+            return np.zeros(self.num_bins, dtype=float)
+        return self.counts / (self.bin_size_ms * 10 ** (-3) * self.num_trials)
+
+
+class InterSpikeIntervalHistogram:
+    """
+    Running histogram of inter-spike intervals with fixed bins of bin_size_ms
+    up to max_interval_ms. Longer intervals land in a final overflow bin.
+    """
+
+    def __init__(self, bin_size_ms: int, max_interval_ms: int):
+        if bin_size_ms <= 0:
+            raise SpikeStatsError("Bin size must be positive.")
+        self.bin_size_ms = bin_size_ms
+        self.num_bins = int(np.ceil(max_interval_ms / bin_size_ms))
+        self.counts = np.zeros(self.num_bins + 1, dtype=np.int64)
+        self.moments = RunningMoments()
+
+    def update(self, spike_trains: List[np.ndarray]) -> None:
+        if not spike_trains:
+            return
+        intervals = np.concatenate(
+            [np.diff(np.asarray(t, dtype=float)) for t in spike_trains]
+        )
+        idx = np.floor(intervals / self.bin_size_ms)
+        idx = np.clip(idx, 0, self.num_bins).astype(np.int64)
+        self.counts += np.bincount(idx, minlength=self.num_bins + 1)
+        self.moments.update(intervals)
+
+    def merge(
+        self, other: "InterSpikeIntervalHistogram"
+    ) -> "InterSpikeIntervalHistogram":
+        if self.bin_size_ms != other.bin_size_ms or self.num_bins != other.num_bins:
+            raise SpikeStatsError("Cannot merge histograms with different bins.")
+        self.counts += other.counts
+        self.moments.merge(other.moments)
+        return self
+
+    @property
+    def bin_edges(self) -> np.ndarray:
+        """
+        Left edges (ms) of every bin, including the overflow bin.
+        """
+        return np.arange(self.num_bins + 1) * self.bin_size_ms
+
+
+class RasterStatistics:
+    """
+    Bundles the streaming accumulators behind the synthetic subcommand: the PSTH,
+    the ISI histogram and the mean/variance of the spike count per trial.
+
+    All three only see the spikes inside [start_time_ms, start_time_ms +
+    duration_ms); generate_rasters always emits one spike past the window.
+    """
+
+    def __init__(
+        self,
+        start_time_ms: int,
+        duration_ms: int,
+        bin_size_ms: int,
+        max_interval_ms: Optional[int] = None,
+    ):
+        self.start_time_ms = start_time_ms
+        self.end_time_ms = start_time_ms + np.sum(duration_ms)
+        self.psth = SpikeTimeHistogram(start_time_ms, duration_ms, bin_size_ms)
+        self.isi = InterSpikeIntervalHistogram(
+            bin_size_ms,
+            max_interval_ms if max_interval_ms is not None else np.sum(duration_ms),
+        )
+        self.spike_counts = RunningMoments()
+
+    def update(self, spike_trains: List[np.ndarray]) -> None:
+        spike_trains = [np.asarray(t, dtype=float) for t in spike_trains]
+        spike_trains = [
+            t[(t >= self.start_time_ms) & (t < self.end_time_ms)] for t in spike_trains
+        ]
+        self.psth.update(spike_trains)
+        self.isi.update(spike_trains)
+        self.spike_counts.update([len(t) for t in spike_trains])
+
+    def consume(
+        self, spike_trains: Iterable[np.ndarray], batch_size: int = 1024
+    ) -> "RasterStatistics":
+        """
+        Drains a stream of rasters batch by batch.
+        """
+        for batch in batched(spike_trains, batch_size):
+            self.update(batch)
+        return self
+
+    def merge(self, other: "RasterStatistics") -> "RasterStatistics":
+        self.psth.merge(other.psth)
+        self.isi.merge(other.isi)
+        self.spike_counts.merge(other.spike_counts)
+        return self
+
+    @property
+    def num_trials(self) -> int:
+        return self.psth.num_trials
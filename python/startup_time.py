@@ -0,0 +1,92 @@
+"""
+Startup-time guard for the nsimulate.py CLI.
+
+Launches each headless subcommand with --help (so everything is imported and
+the arguments parsed, but nothing simulated) and fails if it loads one of the
+heavy backends or takes longer than the budget to start.
+
+$ python3 startup_time.py --budget-ms 400
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Set
+
+# Backends that must only be loaded by the subcommands that use them.
+HEAVY_MODULES = ["matplotlib", "scipy", "asyncio", "concurrent.futures"]
+
+# Subcommands that must start without plotting, MAT or network backends.
+HEADLESS_MODES = ["simulate", "train", "sweep", "synthetic"]
+
+NSIMULATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nsimulate.py")
+
+
+def _imported_modules(mode: str) -> Set[str]:
+    """
+    Names of every module imported while starting the given subcommand.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", NSIMULATE, mode, "--help"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip())
+    return modules
+
+
+def _startup_ms(mode: str, repeats: int) -> float:
+    """
+    Best-of-N wall time (ms) to start the given subcommand.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, NSIMULATE, mode, "--help"],
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def main(args) -> int:
+    failures = []
+    for mode in HEADLESS_MODES:
+        modules = _imported_modules(mode)
+        loaded = [m for m in HEAVY_MODULES if m in modules]
+        elapsed = _startup_ms(mode, args.repeats)
+        print(f"{mode}: {elapsed:.1f} ms")
+        if loaded:
+            failures.append(f"{mode} imports {', '.join(loaded)} at startup")
+        if elapsed > args.budget_ms:
+            failures.append(f"{mode} took {elapsed:.1f} ms > {args.budget_ms} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("nsimulate.py startup-time guard.")
+    parser.add_argument(
+        "--budget-ms",
+        "-b",
+        type=float,
+        default=400,
+        help="maximum allowed startup time of each subcommand in ms",
+    )
+    parser.add_argument(
+        "--repeats",
+        "-n",
+        type=int,
+        default=5,
+        help="number of launches per subcommand, the fastest is kept",
+    )
+    sys.exit(main(parser.parse_args()))
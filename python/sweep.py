@@ -0,0 +1,204 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from neuron import NeuronSimulator, SpikeDistribution
+from spike_stats import RasterStatistics
+
+# Bump whenever the simulator or the stored summaries change meaning, so that
+# stale cache entries are no longer hit.
+CACHE_VERSION = 2
+
+
+# Top-level keys understood by build_grid.
+SPEC_KEYS = {"rand", "stimuli", "scale_factor", "num_trials", "start_time", "bin_size"}
+
+
+class SweepError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class SweepPoint:
+    """
+    A single NeuronSimulator/stimulus configuration of a parameter sweep.
+    """
+
+    rand: str
+    rates: Tuple[float, ...]
+    intervals: Tuple[float, ...]
+    scale_factor: Optional[float]
+    num_trials: int
+    start_time: int
+    bin_size: int
+    seed: int
+
+    def key(self) -> str:
+        """
+        Content address of this point's results: a hash of the configuration,
+        seed included.
+        """
+        config = dict(asdict(self), version=CACHE_VERSION)
+        blob = json.dumps(config, sort_keys=True).encode()
+        return hashlib.sha256(blob).hexdigest()
+
+
+def build_grid(spec: Dict, seed: int) -> List[SweepPoint]:
+    """
+    Expands a sweep specification into the cartesian product of its values.
+
+    {
+      "rand": ["EXP", "GAMMA"],
+      "stimuli": [{"rates": [50], "intervals": [2000]}, ...],
+      "scale_factor": [1, 2],
+      "num_trials": [100],
+      "start_time": [0],
+      "bin_size": [10]
+    }
+
+    scale_factor only applies to GAMMA, so other distributions collapse to a
+    single point. Numeric values are normalized (e.g. 2 and 2.0) so that equal
+    configurations always hash to the same cache key.
+    """
+    unknown = set(spec) - SPEC_KEYS
+    if unknown:
+        raise SweepError(f"Unknown sweep keys: {', '.join(sorted(unknown))}")
+    if "stimuli" not in spec:
+        raise SweepError("A sweep needs at least one stimulus.")
+    for rand in spec.get("rand", []):
+        if rand not in SpikeDistribution.__members__:
+            raise SweepError(f"Unknown distribution {rand}.")
+    for stimulus in spec["stimuli"]:
+        if len(stimulus["rates"]) != len(stimulus["intervals"]):
+            raise SweepError(f"Rates and intervals must be 1:1: {stimulus}")
+
+    points = []
+    for (
+        rand,
+        stimulus,
+        scale_factor,
+        num_trials,
+        start_time,
+        bin_size,
+    ) in itertools.product(
+        spec.get("rand", [SpikeDistribution.EXP.name]),
+        spec["stimuli"],
+        spec.get("scale_factor", [None]),
+        spec.get("num_trials", [100]),
+        spec.get("start_time", [0]),
+        spec.get("bin_size", [10]),
+    ):
+        if rand != SpikeDistribution.GAMMA.name:
+            scale_factor = None
+        elif scale_factor is None:
+            raise SweepError("GAMMA sweeps require a scale_factor.")
+        else:
+            scale_factor = float(scale_factor)
+        points.append(
+            SweepPoint(
+                rand=rand,
+                rates=tuple(float(r) for r in stimulus["rates"]),
+                intervals=tuple(float(i) for i in stimulus["intervals"]),
+                scale_factor=scale_factor,
+                num_trials=int(num_trials),
+                start_time=int(start_time),
+                bin_size=int(bin_size),
+                seed=seed,
+            )
+        )
+    # dict.fromkeys de-duplicates while keeping the grid order
+    return list(dict.fromkeys(points))
+
+
+def run_point(point: SweepPoint) -> Dict[str, np.ndarray]:
+    """
+    Simulates one sweep point and reduces it to its summary statistics. Runs
+    in the pool workers, so it must stay importable from this module alone.
+    """
+    neuron = NeuronSimulator(
+        SpikeDistribution[point.rand],
+        scaling_factor=point.scale_factor,
+        seed=point.seed,
+    )
+    stats = RasterStatistics(
+        start_time_ms=point.start_time,
+        duration_ms=sum(point.intervals),
+        bin_size_ms=point.bin_size,
+    ).consume(
+        neuron.generate_rasters(
+            spike_rate_hz=np.asarray(point.rates),
+            intervals_ms=np.asarray(point.intervals),
+            num_trials=point.num_trials,
+            start_time=point.start_time,
+        )
+    )
+    return {
+        "psth": stats.psth.rates,
+        "isi_counts": stats.isi.counts,
+        "isi_bin_edges": stats.isi.bin_edges,
+        "isi_moments": np.array(
+            [stats.isi.moments.count, stats.isi.moments.mean, stats.isi.moments.m2]
+        ),
+        "spike_count_moments": np.array(
+            [
+                stats.spike_counts.count,
+                stats.spike_counts.mean,
+                stats.spike_counts.m2,
+            ]
+        ),
+    }
+
+
+class SweepCache:
+    """
+    Directory of .npz summaries named by SweepPoint.key().
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, point: SweepPoint) -> str:
+        return os.path.join(self.cache_dir, point.key() + ".npz")
+
+    def __contains__(self, point: SweepPoint) -> bool:
+        return os.path.exists(self._path(point))
+
+    def load(self, point: SweepPoint) -> Dict[str, np.ndarray]:
+        with np.load(self._path(point)) as data:
+            return dict(data)
+
+    def store(self, point: SweepPoint, result: Dict[str, np.ndarray]) -> None:
+        # Write to a unique temporary file then rename, so an interrupted or
+        # concurrent sweep never leaves a truncated entry behind.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **result)
+            os.replace(tmp_path, self._path(point))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def run_sweep(
+    points: List[SweepPoint],
+    cache: SweepCache,
+    max_workers: Optional[int] = None,
+) -> List[Tuple[SweepPoint, Dict[str, np.ndarray]]]:
+    """
+    Computes every point missing from the cache across a process pool and
+    returns the results of the whole grid, in grid order.
+    """
+    missing = [point for point in points if point not in cache]
+    if missing:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for point, result in zip(missing, pool.map(run_point, missing)):
+                cache.store(point, result)
+
+    return [(point, cache.load(point)) for point in points]